@@ -0,0 +1,37 @@
+"""
+Renderers for the API.
+"""
+import orjson
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Render JSON with orjson instead of the standard library."""
+    # orjson handles dicts, lists, strings, numbers and UUIDs natively, and
+    # with OPT_NON_STR_KEYS turns keys such as the ints in ListField errors
+    # into strings like json.dumps does. Dates and times are passed through
+    # so that DRF's encoder formats them (e.g. a UTC datetime ends in "Z"),
+    # as is anything else orjson can't encode (Decimal, lazy translations).
+    encoder = JSONEncoder()
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into JSON bytes."""
+        if data is None:
+            return b''
+
+        option = self.options
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+
+        ret = orjson.dumps(data, default=self.encoder.default, option=option)
+
+        # Like JSONRenderer, escape the two unicode line separators, which
+        # are valid JSON but not valid JavaScript.
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace(
+            '\u2029'.encode(), b'\\u2029'
+        )
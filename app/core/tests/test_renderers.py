@@ -0,0 +1,66 @@
+"""
+Tests for renderers.
+"""
+import datetime
+import json
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """Test the orjson renderer."""
+
+    def test_render_nested_data(self):
+        """Test rendering nested data matches the stdlib output."""
+        data = {
+            'id': 1,
+            'title': 'Sample recipe',
+            'tags': [{'id': 1, 'name': 'Vegan'}],
+        }
+
+        res = ORJSONRenderer().render(data)
+
+        self.assertEqual(json.loads(res), data)
+
+    def test_render_decimal(self):
+        """Test rendering a Decimal falls back to DRF's encoder."""
+        res = ORJSONRenderer().render({'price': Decimal('5.25')})
+
+        self.assertEqual(json.loads(res), {'price': 5.25})
+
+    def test_render_int_keys(self):
+        """Test rendering a dict with int keys matches DRF's renderer."""
+        data = {0: ['This field is required.']}
+
+        res = ORJSONRenderer().render(data)
+
+        self.assertEqual(res, JSONRenderer().render(data))
+
+    def test_render_datetime(self):
+        """Test rendering a datetime matches DRF's renderer."""
+        data = {
+            'created': datetime.datetime(
+                2024, 2, 17, 9, 23, tzinfo=datetime.timezone.utc,
+            ),
+        }
+
+        res = ORJSONRenderer().render(data)
+
+        self.assertEqual(res, JSONRenderer().render(data))
+
+    def test_render_line_separators(self):
+        """Test unicode line separators are escaped like DRF does."""
+        data = {'title': 'Pancakes\u2028and\u2029syrup'}
+
+        res = ORJSONRenderer().render(data)
+
+        self.assertEqual(res, JSONRenderer().render(data))
+
+    def test_render_none(self):
+        """Test rendering None returns an empty body."""
+        self.assertEqual(ORJSONRenderer().render(None), b'')
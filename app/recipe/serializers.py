@@ -1,6 +1,8 @@
 """
 Serializers for recipe APIs.
 """
+from django.db import transaction
+
 from rest_framework import serializers
 
 from core.models import (
@@ -10,7 +12,29 @@ from core.models import (
 )
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class CachedRepresentationMixin:
+    """Reuse the representation of objects already serialized in a request.
+
+    The same tag or ingredient usually appears on many recipes in a list, so
+    we keep each representation in the serializer context, which only lives
+    as long as the request.
+    """
+
+    def to_representation(self, instance):
+        # Validated data and unsaved objects have no primary key to cache on.
+        if getattr(instance, 'pk', None) is None:
+            return super().to_representation(instance)
+
+        cache = self.context.setdefault('_repr_cache', {})
+        key = (type(self), instance.pk)
+        if key not in cache:
+            cache[key] = super().to_representation(instance)
+
+        return cache[key]
+
+
+class IngredientSerializer(CachedRepresentationMixin,
+                           serializers.ModelSerializer):
     """Serializer for ingredients."""
 
     class Meta:
@@ -19,7 +43,7 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(CachedRepresentationMixin, serializers.ModelSerializer):
     """Serializer for tags."""
 
     class Meta:
@@ -28,7 +52,27 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Only serialize the fields listed in the `fields` query parameter."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        # Only trim reads, so that a write can never silently drop the
+        # values it was sent.
+        if request is None or request.method != 'GET':
+            return
+
+        fields = request.query_params.get('fields')
+        if fields:
+            requested = {
+                name.strip() for name in fields.split(',') if name.strip()
+            }
+            for field_name in set(self.fields) - requested:
+                self.fields.pop(field_name)
+
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for recipes."""
     tags = TagSerializer(many=True, required=False)  # many=True this is
     # going to be a list of items.
@@ -42,21 +86,59 @@ class RecipeSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id']
 
-    def _get_or_create_tags(self, tags, recipe):
-        """Handle getting or creating tags as needed."""
-        # Then we're getting the authenticate user. Because we're doing this in
-        # a sterilizer and not the view, we need to use this self.context
-        # request.
+    # Write updates with a single queryset UPDATE instead of Model.save().
+    # That skips the save signals and the fields' pre_save hooks (which is
+    # where an uploaded image gets stored), so only turn it on for
+    # serializers whose writable fields don't rely on them.
+    update_with_queryset = False
+
+    def _bulk_get_or_create(self, model, items):
+        """Return the user's objects matching items, creating missing ones."""
+        # Rather than calling get_or_create once per item (a SELECT and
+        # possibly an INSERT each time), we look up every existing name in
+        # one query, insert all the missing ones in one query and then read
+        # them back so that we have their primary keys on every backend.
         auth_user = self.context['request'].user
-        # Then we're going to loop through all of the tags that we popped off
-        # the loop is going to give us functionality to not create duplicate
-        # tags in the system.
-        for tag in tags:
-            tag_obj, _ = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
+        # Objects we already resolved while handling this request (say, when
+        # several recipes are saved together and share tags) are kept in the
+        # context, so repeated names don't go back to the database.
+        cache = self.context.setdefault('_object_cache', {})
+        names = list(dict.fromkeys(item['name'] for item in items))
+        misses = [
+            name for name in names
+            if (model, auth_user.pk, name) not in cache
+        ]
+
+        if misses:
+            existing = {
+                obj.name: obj for obj in model.objects.filter(
+                    user=auth_user,
+                    name__in=misses,
+                )
+            }
+            missing = [
+                model(user=auth_user, name=name)
+                for name in misses if name not in existing
+            ]
+            if missing:
+                model.objects.bulk_create(missing)
+                existing.update(
+                    (obj.name, obj) for obj in model.objects.filter(
+                        user=auth_user,
+                        name__in=[obj.name for obj in missing],
+                    )
+                )
+            cache.update(
+                ((model, auth_user.pk, name), obj)
+                for name, obj in existing.items()
             )
-            recipe.tags.add(tag_obj)
+
+        return [cache[(model, auth_user.pk, name)] for name in names]
+
+    def _get_or_create_tags(self, tags, recipe):
+        """Handle getting or creating tags as needed."""
+        tag_objs = self._bulk_get_or_create(Tag, tags)
+        recipe.tags.add(*tag_objs)
     # These nested serializers, those are read only. So that means you can read
     # he values, but you can't create items with those values. We want to add
     # the feature to be able to create them. We're going to do that by adding
@@ -65,22 +147,20 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     def _get_or_create_ingredients(self, ingredients, recipe):
         """Handle getting or creating ingredients as needed."""
-        # So the idea is that it's going to either get an existing ingredient
-        # or create a new ingredient. Ultimately, it's going to be adding an
-        # ingredient to the recipe object. So we start by retrieving the
-        # authenticated user so we can assign the ingredient to the correct
-        # user. Then we're looping through all of the ingredients that were
-        # passed in as an argument here at the top. And then we are calling
-        # the get_or_create helper method on the objects manager for our
-        # ingredient model.
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, _ = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
-
+        ingredient_objs = self._bulk_get_or_create(Ingredient, ingredients)
+        recipe.ingredients.add(*ingredient_objs)
+
+    def _set_related(self, related, model, items):
+        """Point a recipe relation at items, skipping it if unchanged."""
+        # Clients often send the same tags back when they update a recipe.
+        # Comparing names first, in a single query, lets us skip the lookups
+        # entirely. Otherwise set() only removes the rows that are no longer
+        # wanted and adds the new ones, so kept rows are left untouched.
+        names = {item['name'] for item in items}
+        if names != set(related.values_list('name', flat=True)):
+            related.set(self._bulk_get_or_create(model, items))
+
+    @transaction.atomic
     def create(self, validated_data):
         """Create a recipe."""
         # So this is why we are using pop here because we want to make sure we
@@ -100,6 +180,7 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):  # instance is the existing
         # object that we're going to update with the validated data.
         """Update a recipe."""
@@ -114,17 +195,24 @@ class RecipeSerializer(serializers.ModelSerializer):
         # the title, time_minutes, price, link, and any other fields that we
         # pass in.
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._set_related(instance.tags, Tag, tags)
 
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            self._set_related(instance.ingredients, Ingredient, ingredients)
+
+        # Only write the columns that were actually sent, and skip the UPDATE
+        # altogether when the request only touched tags or ingredients.
+        if validated_data:
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+            if self.update_with_queryset:
+                type(instance).objects.filter(pk=instance.pk).update(
+                    **validated_data
+                )
+            else:
+                instance.save(update_fields=list(validated_data.keys()))
 
-        instance.save()
         return instance
 
 
@@ -2,6 +2,7 @@
 Tests for recipe APIs.
 """
 from decimal import Decimal
+from unittest.mock import patch
 import tempfile
 import os
 
@@ -12,7 +13,12 @@ from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.request import Request
+from rest_framework.serializers import ModelSerializer
+from rest_framework.test import (
+    APIClient,
+    APIRequestFactory,
+)
 
 from core.models import (
     Recipe,
@@ -24,6 +30,7 @@ from core.models import (
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
+    TagSerializer,
 )
 
 RECIPES_URL = reverse('recipe:recipe-list')
@@ -93,6 +100,76 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_retrieve_recipes_query_count(self):
+        """Test listing recipes doesn't query tags/ingredients per recipe."""
+        for title in ('Pancakes', 'Porridge', 'Omelette'):
+            recipe = create_recipe(user=self.user, title=title)
+            recipe.tags.add(Tag.objects.create(user=self.user, name=title))
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=title)
+            )
+
+        # One query for the recipes, one each for tags and ingredients.
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 3)
+
+    def test_retrieve_recipes_sparse_fields(self):
+        """Test listing recipes returns only the requested fields."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        # Tags and ingredients aren't requested, so they aren't prefetched.
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'id': recipe.id, 'title': recipe.title}])
+
+    def test_retrieve_recipes_sharing_tag(self):
+        """Test a tag shared by listed recipes renders on each of them."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe1 = create_recipe(user=self.user, title='Pancakes')
+        recipe2 = create_recipe(user=self.user, title='Porridge')
+        recipe1.tags.add(tag)
+        recipe2.tags.add(tag)
+
+        to_representation = ModelSerializer.to_representation
+        with patch.object(
+            ModelSerializer,
+            'to_representation',
+            autospec=True,
+            side_effect=to_representation,
+        ) as mock_to_representation:
+            res = self.client.get(RECIPES_URL)
+
+        # The shared tag is only serialized once for the whole request.
+        tag_calls = [
+            call for call in mock_to_representation.call_args_list
+            if isinstance(call.args[0], TagSerializer)
+        ]
+        self.assertEqual(len(tag_calls), 1)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        expected = [{'id': tag.id, 'name': 'Vegan'}]
+        self.assertEqual(res.data[0]['tags'], expected)
+        self.assertEqual(res.data[1]['tags'], expected)
+
+    def test_retrieve_recipes_after_tag_renamed(self):
+        """Test a renamed tag isn't served stale by a later request."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+        self.client.get(RECIPES_URL)
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['tags'][0]['name'], 'Vegetarian')
+
     def test_recipe_list_limited_to_user(self):
         """Test list of recipes is limited to authenticated user."""
         other_user = create_user(email='other@example.com', password='test123')
@@ -116,6 +193,20 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeDetailSerializer(recipe)
         self.assertEqual(res.data, serializer.data)
 
+    def test_get_recipe_detail_sparse_fields(self):
+        """Test recipe detail returns only the requested fields."""
+        recipe = create_recipe(user=self.user)
+
+        url = detail_url(recipe.id)
+        res = self.client.get(url, {'fields': 'id, title,description'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'id': recipe.id,
+            'title': recipe.title,
+            'description': recipe.description,
+        })
+
     def test_create_recipe(self):
         """Test creating recipe."""
         payload = {
@@ -150,6 +241,34 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(recipe.link, original_link)
         self.assertEqual(recipe.user, self.user)
 
+    @patch.object(RecipeDetailSerializer, 'update_with_queryset', True)
+    def test_partial_update_with_queryset(self):
+        """Test partial update of a recipe through a queryset update."""
+        recipe = create_recipe(user=self.user, title='Sample recipe title')
+
+        payload = {'title': 'New recipe title'}
+        url = detail_url(recipe.id)
+        res = self.client.patch(url, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], payload['title'])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, payload['title'])
+        self.assertEqual(recipe.user, self.user)
+
+    def test_partial_update_query_count(self):
+        """Test a partial update without tags doesn't prefetch relations."""
+        recipe = create_recipe(user=self.user)
+
+        payload = {'title': 'New recipe title'}
+        url = detail_url(recipe.id)
+        # Loading the recipe, the transaction savepoint, the UPDATE and the
+        # savepoint release, then reading the relations for the response.
+        with self.assertNumQueries(6):
+            res = self.client.patch(url, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
     def test_full_update(self):
         """Test full update of the recipe."""
         recipe = create_recipe(
@@ -198,6 +317,20 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Recipe.objects.filter(id=recipe.id).exists())
 
+    def test_delete_recipe_query_count(self):
+        """Test deleting a recipe doesn't prefetch its relations."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        url = detail_url(recipe.id)
+        # Loading the recipe, then deleting its tag links, its ingredient
+        # links and the recipe itself.
+        with self.assertNumQueries(4):
+            res = self.client.delete(url)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Recipe.objects.filter(id=recipe.id).exists())
+
     def test_delete_other_users_recipe_error(self):
         """Test trying to delete another users recipe gives an error."""
         new_user = create_user(email='user2@example.com', password='test123')
@@ -250,6 +383,38 @@ class PrivateRecipeApiTests(TestCase):
             ).exists()
             self.assertTrue(exists)
 
+    def test_create_recipe_with_repeated_tag_names(self):
+        """Test repeated tag names in a payload create a single tag."""
+        tag_thai = Tag.objects.create(user=self.user, name='Thai')
+        payload = {
+            'title': 'Pad Thai',
+            'time_minutes': 20,
+            'price': Decimal('4.50'),
+            'tags': [{'name': 'Thai'}, {'name': 'Dinner'}, {'name': 'Dinner'}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertIn(tag_thai, recipe.tags.all())
+        self.assertEqual(
+            Tag.objects.filter(user=self.user, name='Dinner').count(), 1
+        )
+
+    def test_resolved_tags_reused_within_context(self):
+        """Test resolved tags are reused within one serializer context."""
+        request = Request(APIRequestFactory().post(RECIPES_URL))
+        request.user = self.user
+        serializer = RecipeSerializer(context={'request': request})
+        tags = serializer._bulk_get_or_create(Tag, [{'name': 'Vegan'}])
+
+        with self.assertNumQueries(0):
+            cached = serializer._bulk_get_or_create(Tag, [{'name': 'Vegan'}])
+
+        self.assertEqual(cached, tags)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_create_recipe_with_existing_tags(self):
         """Test creating a recipe with existing tags."""
         # This is going to be a recipe for an indian meal.
@@ -328,6 +493,47 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(tag_lunch, recipe.tags.all())
         self.assertNotIn(tag_breakfast, recipe.tags.all())
 
+    def test_update_recipe_keeps_existing_tag(self):
+        """Test tags kept in an update payload stay assigned to the recipe."""
+        tag_breakfast = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag_breakfast)
+        through = Recipe.tags.through.objects.get(recipe=recipe)
+
+        payload = {'tags': [{'name': 'Breakfast'}, {'name': 'Lunch'}]}
+        url = detail_url(recipe.id)
+        res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(recipe.tags.count(), 2)
+        # The existing link row is kept rather than deleted and re-inserted.
+        self.assertTrue(
+            Recipe.tags.through.objects.filter(id=through.id).exists()
+        )
+
+    def test_update_recipe_same_tags_no_writes(self):
+        """Test sending a recipe's current tags back doesn't rewrite them."""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+
+        payload = {'tags': [{'name': 'Breakfast'}]}
+        url = detail_url(recipe.id)
+        through = Recipe.tags.through.objects.get(recipe=recipe)
+        # Loading the recipe, the transaction savepoint and its release,
+        # reading the current tag names in one query, then reading the
+        # relations for the response. Nothing prefetches, looks up, deletes
+        # or inserts tags.
+        with self.assertNumQueries(6):
+            res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(
+            Recipe.tags.through.objects.filter(id=through.id).exists()
+        )
+        self.assertEqual(list(recipe.tags.all()), [tag])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_clear_recipe_tags(self):
         """Test clearing all a recipes tags."""
         tag = Tag.objects.create(user=self.user, name='Dessert')
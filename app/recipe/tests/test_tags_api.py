@@ -2,6 +2,7 @@
 Tests for the Tag API.
 """
 from decimal import Decimal
+from functools import lru_cache
 
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -21,6 +22,7 @@ from recipe.serializers import TagSerializer
 TAGS_URL = reverse('recipe:tag-list')
 
 
+@lru_cache(maxsize=None)
 def detail_url(tag_id):
     """Create and return tag detail URL."""
     return reverse('recipe:tag-detail', args=[tag_id])
@@ -62,8 +64,9 @@ class PrivateTagsApiTests(TestCase):
         """Test retrieving a list of tags."""
         # So this is just two sample tags that we're going to use to test with.
         # That's the setup that we need to do.
-        Tag.objects.create(user=self.user, name='Vegan')
-        Tag.objects.create(user=self.user, name='Dessert')
+        Tag.objects.bulk_create([
+            Tag(user=self.user, name=name) for name in ('Vegan', 'Dessert')
+        ])
 
         # Now we're actually execute the code by calling the API.
         res = self.client.get(TAGS_URL)
@@ -71,14 +74,13 @@ class PrivateTagsApiTests(TestCase):
         # And then we're going to assert that the response is what we expect.
         # We will check the results.
         tags = Tag.objects.all().order_by('-name')
-        # And then we're going to serialize the tags and then compare the
-        # response data to the serialized data.
+        # And then we're going to build the expected output and then compare
+        # the response data to it.
         # So it will be a list of objects.
-        serializer = TagSerializer(tags, many=True)
-        # We're going to compare the response data to the serialized data.
+        expected = [{'id': tag.id, 'name': tag.name} for tag in tags]
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        # We're going to compare the response data to the serialized data.
-        self.assertEqual(res.data, serializer.data)
+        # We're going to compare the response data to the expected data.
+        self.assertEqual(list(res.data), expected)
         # So that's testing the retrieve tags, basic test.
 
     def test_tags_limited_to_user(self):
@@ -140,6 +142,13 @@ class PrivateTagsApiTests(TestCase):
         self.assertIn(s1.data, res.data)
         self.assertNotIn(s2.data, res.data)
 
+    def test_serialize_validated_tag(self):
+        """Test reading data from a validated, unsaved tag."""
+        serializer = TagSerializer(data={'name': 'Brunch'})
+
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.data, {'name': 'Brunch'})
+
     def test_filtered_tags_unique(self):
         """Test that filtered tags are unique."""
         tag = Tag.objects.create(user=self.user, name='Breakfast')